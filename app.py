@@ -8,6 +8,7 @@ from plotly.subplots import make_subplots
 import warnings
 from datetime import datetime, timedelta
 import io
+import pyarrow.parquet as pq
 import folium
 from streamlit_folium import st_folium
 
@@ -58,7 +59,36 @@ st.markdown("""
 # ============================================================================
 # DATA LOADING & PREPARATION
 # ============================================================================
-@st.cache_data
+# Columns read by the dashboard; optional ones are only requested if present in the file
+PARQUET_COLUMNS = [
+    'rideable_type', 'started_at', 'ended_at', 'member_casual',
+    'start_station_name', 'end_station_name', 'start_lat', 'start_lng',
+]
+OPTIONAL_PARQUET_COLUMNS = ['ride_time_min', 'weekday', 'season']
+WEEKDAY_ORDER = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+SEASON_ORDER = ['Winter', 'Spring', 'Summer', 'Fall']
+# 12-hour clock label for each hour of the day, indexed by hour
+HOUR_LABELS = np.array([f"{h % 12 or 12}:00 {'AM' if h < 12 else 'PM'}" for h in range(24)])
+# Season for each calendar month, indexed by month - 1
+MONTH_SEASONS = np.array([
+    'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+    'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter',
+])
+CATEGORY_COLUMNS = [
+    'rideable_type', 'season', 'weekday', 'month_year', 'start_station_name', 'end_station_name',
+]
+# String columns decoded straight from parquet dictionaries into categoricals (no Python str objects)
+DICTIONARY_COLUMNS = [
+    'member_casual', 'rideable_type', 'start_station_name', 'end_station_name', 'weekday', 'season',
+]
+
+# Prepared (cleaned, typed, feature-engineered) frame written by load_data on first run.
+# Bump the version whenever load_data changes the columns, dtypes or features it builds,
+# so files in the old format are ignored instead of reused.
+PREPARED_DATA_VERSION = 2
+PREPARED_DATA_PATH = f"Data/prepared_v{PREPARED_DATA_VERSION}.parquet"
+
+@st.cache_resource
 def load_data():
     """Load data from parquet file with error handling and prepare date columns"""
     try:
@@ -68,41 +98,108 @@ def load_data():
         if not os.path.exists(data_path):
             st.error(f"❌ Parquet file not found at: {data_path}")
             return None
-        df = pd.read_parquet(data_path)
+        
+        # Reuse the prepared frame unless the source file has changed since it was written;
+        # categorical, float32 and int8 dtypes round-trip through the parquet metadata.
+        # An unreadable prepared file is rebuilt from the source below (and then replaced).
+        if (os.path.exists(PREPARED_DATA_PATH)
+                and os.path.getmtime(PREPARED_DATA_PATH) >= os.path.getmtime(data_path)):
+            try:
+                df = pd.read_parquet(PREPARED_DATA_PATH, engine='pyarrow')
+                st.success(f"✅ Data loaded successfully: {len(df):,} rides")
+                return df
+            except Exception as e:
+                st.warning(f"⚠️ Could not read prepared data at {PREPARED_DATA_PATH}, rebuilding it: {str(e)}")
+        
+        # Project columns and push the ride-length filter down to the reader so unused
+        # columns and out-of-range row groups are never decoded
+        available = set(pq.read_schema(data_path).names)
+        columns = PARQUET_COLUMNS + [c for c in OPTIONAL_PARQUET_COLUMNS if c in available]
+        filters = None
+        if 'ride_time_min' in available:
+            filters = [('ride_time_min', '>', 1), ('ride_time_min', '<', 1440)]
+        read_dictionary = [c for c in DICTIONARY_COLUMNS if c in columns]
+        df = pd.read_parquet(data_path, engine='pyarrow', columns=columns, filters=filters,
+                             read_dictionary=read_dictionary)
         
         # Ensure datetime columns are properly formatted
         df['started_at'] = pd.to_datetime(df['started_at'], errors='coerce')
         df['ended_at'] = pd.to_datetime(df['ended_at'], errors='coerce')
-        df = df.dropna(subset=['started_at', 'ended_at'])
+        started = df['started_at'].to_numpy()
+        ended = df['ended_at'].to_numpy()
+        
+        # Calculate ride time directly on the datetime64 buffers
+        if 'ride_time_min' not in df.columns:
+            df['ride_time_min'] = ((ended - started) / np.timedelta64(1, 'm')).astype(np.float32)
+        
+        # One validity mask and a single row selection: drop missing timestamps and rides that are
+        # too short (e.g., less than 1 minute) or too long (e.g., > 24 hours)
+        ride_time = df['ride_time_min'].to_numpy()
+        valid = ~np.isnat(started) & ~np.isnat(ended) & (ride_time > 1) & (ride_time < 1440)
+        df = df.loc[valid]
         
         # Validate data integrity
         if df.empty:
             st.error("❌ Dataset is empty!")
             return None
-        
-        # Calculate ride time
-        if 'ride_time_min' not in df.columns:
-            df['ride_time_min'] = (df['ended_at'] - df['started_at']).dt.total_seconds() / 60
-        
-        # Remove rides that are too short (e.g., less than 1 minute) or too long (e.g., > 24 hours)
-        df = df[(df['ride_time_min'] > 1) & (df['ride_time_min'] < 1440)]
+
+        # Normalize rider labels once (on the categories, not per row) and precompute
+        # integer indicator columns so groupby sums stay on the cythonized path
+        df['member_casual'] = df['member_casual'].astype('category')
+        label_map = {label: str(label).strip().lower() for label in df['member_casual'].cat.categories}
+        df['member_casual'] = df['member_casual'].map(label_map).astype('category')
+        df['is_member'] = (df['member_casual'] == 'member').astype('uint32')
+        df['is_casual'] = (df['member_casual'] == 'casual').astype('uint32')
 
         # --- Mandatory for sorting and plotting ---
-        df['month_year'] = df['started_at'].dt.to_period('M').astype(str)
-        df['hour'] = df['started_at'].dt.hour
-        df['date'] = df['started_at'].dt.date
+        # All calendar features come from the same datetime64 buffer via numpy unit casts
+        started = df['started_at'].to_numpy()
+        days = started.astype('datetime64[D]')
+        months = started.astype('datetime64[M]')
+        month_codes = months.astype(np.int64)  # months since 1970-01
+
+        # month_year: integer month codes; only the distinct 'YYYY-MM' labels are formatted
+        month_labels = np.datetime_as_string(np.arange(months.min(), months.max() + 1), unit='M')
+        df['month_year'] = pd.Categorical.from_codes(month_codes - month_codes.min(), categories=month_labels, ordered=True)
+        df['hour'] = ((started - days) // np.timedelta64(1, 'h')).astype(np.int8)
+        df['date'] = days
         # --- End of mandatory columns ---
+
+        # Downcast numeric columns (float32) to halve the bytes read by every sum/mean
+        df['ride_time_min'] = pd.to_numeric(df['ride_time_min'], downcast='float')
+        for col in ['start_lat', 'start_lng']:
+            df[col] = pd.to_numeric(df[col], downcast='float')
         
-        # Add 'weekday' and 'season' columns if they don't exist
+        # Add 'weekday' and 'season' columns if they don't exist (array lookups, no per-row Python)
         if 'weekday' not in df.columns:
-            df['weekday'] = df['started_at'].dt.day_name().str[:3] # e.g., Mon, Tue
+            # 1970-01-01 was a Thursday, so (days since epoch + 3) % 7 gives Mon=0 ... Sun=6
+            weekday_codes = (days.astype(np.int64) + 3) % 7
+            df['weekday'] = pd.Categorical.from_codes(weekday_codes, categories=WEEKDAY_ORDER, ordered=True)
         if 'season' not in df.columns:
-            def get_season(month):
-                if month in [12, 1, 2]: return 'Winter'
-                elif month in [3, 4, 5]: return 'Spring'
-                elif month in [6, 7, 8]: return 'Summer'
-                else: return 'Fall'
-            df['season'] = df['started_at'].dt.month.apply(get_season)
+            seasons = MONTH_SEASONS[month_codes % 12]
+            df['season'] = pd.Categorical(seasons, categories=SEASON_ORDER, ordered=True)
+
+        # Store repeated labels as categoricals: small integer codes instead of Python strings
+        for col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype('category')
+        # Parquet dictionaries list categories in first-appearance order; charts and the bike
+        # filter sort by code, so put bike types in alphabetical order once here
+        df['rideable_type'] = df['rideable_type'].cat.reorder_categories(sorted(df['rideable_type'].cat.categories))
+        
+        # ended_at is only needed for ride_time_min; drop it so filters and groupbys don't carry it
+        df = df.drop(columns=['ended_at'])
+        
+        # Persist the prepared frame so later sessions skip parsing and feature building. Write to a
+        # temp file in the same directory and move it into place, so an interrupted write never
+        # leaves a truncated prepared file behind
+        tmp_path = f"{os.path.splitext(PREPARED_DATA_PATH)[0]}.{os.getpid()}.tmp.parquet"
+        try:
+            df.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+            os.replace(tmp_path, PREPARED_DATA_PATH)
+        except Exception as e:
+            st.warning(f"⚠️ Could not write prepared data to {PREPARED_DATA_PATH}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
         st.success(f"✅ Data loaded successfully: {len(df):,} rides")
         return df
@@ -119,58 +216,206 @@ def load_data():
 # ============================================================================
 
 # --- Data Filtering ---
-def filter_data(df, rider_type, seasons, bike_types):
-    """Filter data based on user selections"""
-    filtered_df = df.copy()
+def category_codes(dtype, labels):
+    """Integer codes of `labels` within a CategoricalDtype (unknown labels are dropped)"""
+    # Looked up on every call: equal unordered dtypes can list their categories in different orders
+    codes = dtype.categories.get_indexer(list(labels))
+    return codes[codes >= 0]
+
+def isin_categorical(series, labels):
+    """Boolean mask of rows whose categorical label is in `labels`, compared on the integer codes"""
+    return np.isin(series.cat.codes.to_numpy(), category_codes(series.dtype, labels))
+
+# cache_resource hands back the stored frame itself (no pickling); callers must not mutate it.
+# Only the last few selections are kept, since each entry can hold a large slice of the data.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def filter_data(_df, data_key, rider_type, seasons, bike_types):
+    """Filter data based on user selections (cached per data_key and selection; `_df` is not hashed)
+    
+    `seasons` and `bike_types` should be sorted tuples so equal selections share one entry.
+    """
+    # Combine all selections into one boolean mask and index once (no full-frame copy)
+    mask = np.ones(len(_df), dtype=bool)
     
     if rider_type != "All Riders":
-        filtered_df = filtered_df[filtered_df['member_casual'] == rider_type.lower()]
+        mask &= isin_categorical(_df['member_casual'], [rider_type.lower()])
     
     if seasons:
-        filtered_df = filtered_df[filtered_df['season'].isin(seasons)]
+        mask &= isin_categorical(_df['season'], seasons)
         
     if bike_types:
-        filtered_df = filtered_df[filtered_df['rideable_type'].isin(bike_types)]
+        mask &= isin_categorical(_df['rideable_type'], bike_types)
     
-    return filtered_df
+    # Nothing filtered out: hand back the loaded frame instead of storing a full copy
+    if mask.all():
+        return _df
+    return _df.loc[mask]
+
+# --- Query Caching ---
+def data_fingerprint(df, *selections):
+    """Cheap cache key for a (filtered) frame: row count, first/last start time and the selections behind it"""
+    if df.empty:
+        return (0,) + selections
+    started = df['started_at']
+    return (len(df), str(started.iloc[0]), str(started.iloc[-1])) + selections
+
+# --- Usage Pattern Queries ---
+@st.cache_data(max_entries=32, show_spinner=False)
+def query_ride_counts(_df, data_key, by):
+    """Ride count table for the usage pattern charts: one row per `by` value, one column per rider type (cached on data_key)"""
+    # Wide form plots directly (one trace per column), so the charts need no long-to-wide reshaping;
+    # rows are sorted on the small table (category order for categoricals, numeric for hour) and
+    # columns by label, so the series order ('casual', 'member') never depends on the filter
+    counts = (_df.groupby([by, 'member_casual'], sort=False, observed=True).size()
+              .unstack('member_casual', fill_value=0).sort_index())
+    counts.columns = counts.columns.astype(str)
+    return counts.sort_index(axis=1)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def query_hourly_counts(_df, data_key):
+    """Hourly ride count table in the same wide form as query_ride_counts, from one 48-bin histogram (cached on data_key)"""
+    # hour is 0-23 and the member indicator 0/1, so every (hour, rider type) pair is one bin of hour * 2 + is_member
+    bins = _df['hour'].to_numpy().astype(np.intp) * 2 + _df['is_member'].to_numpy()
+    counts = np.bincount(bins, minlength=48).reshape(24, 2)
+    hourly = pd.DataFrame(counts, index=pd.RangeIndex(24, name='hour'),
+                          columns=pd.Index(['casual', 'member'], name='member_casual'))
+    # Keep only the rider types present under the current filters
+    return hourly.loc[:, hourly.sum() > 0]
 
 # --- Geographic Queries ---
 
-def query_station_stats(df, station_col, lat_col, lng_col, n=20):
-    """Queries top N stations with ride count and avg duration for mapping/tables"""
-    grouped = df.groupby([station_col]).agg(
-        Trips=('ride_id', 'count'),
-        Avg_Duration=('ride_time_min', 'mean'),
-        Lat=(lat_col, 'first'),
-        Lng=(lng_col, 'first'),
-        Member_Trips=('member_casual', lambda x: (x.astype(str).str.strip().str.lower() == 'member').sum()),
-        Casual_Trips=('member_casual', lambda x: (x.astype(str).str.strip().str.lower() == 'casual').sum())
-    ).reset_index().rename(columns={station_col: 'Station Name', 'Avg_Duration': 'Avg Duration'})
-    
-    grouped['Avg Duration'] = grouped['Avg Duration'].round(0).astype(int)
-    
-    return grouped.sort_values('Trips', ascending=False).head(n)
-
-def query_top_routes(df, n=20):
-    """Queries top N routes with ride count and member/casual breakdown"""
-    routes = df.groupby(['start_station_name', 'end_station_name']).agg({
-        'ride_id': 'count',
-        'ride_time_min': 'mean',
-        'member_casual': lambda x: (x.astype(str).str.strip().str.lower() == 'member').sum()
-    }).reset_index()
-    
-    routes.columns = ['Start Station', 'End Station', 'Trips', 'Avg Duration', 'Member Trips']
-    routes = routes.nlargest(n, 'Trips')
-    routes['Casual Trips'] = routes['Trips'] - routes['Member Trips']
+def sorted_factorize(values):
+    """pd.factorize with codes numbered in sorted label order (like groupby's default sort),
+    whatever the order of the categories; missing values keep code -1"""
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques)
+    order = np.argsort(uniques, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return np.where(codes >= 0, rank[codes], -1), uniques[order]
+
+def group_reduce(codes, sums=None, firsts=None):
+    """Aggregate rows by integer group code with one stable sort and np.add.reduceat.
+    
+    Rows with a negative code (missing key) are dropped. Returns a dict holding the
+    group 'code', its row 'count', the per-group sum of each array in `sums` and the
+    first non-null value (in original row order, NaN if none) of each array in `firsts`.
+    """
+    sums, firsts = sums or {}, firsts or {}
+    rows = np.flatnonzero(codes >= 0)
+    order = rows[np.argsort(codes[rows], kind='stable')]
+    sorted_codes = codes[order]
+    
+    breaks = np.flatnonzero(np.diff(sorted_codes)) + 1
+    breaks = np.r_[0, breaks] if len(sorted_codes) else breaks
+    result = {'code': sorted_codes[breaks], 'count': np.diff(np.r_[breaks, len(sorted_codes)])}
+    
+    for name, values in sums.items():
+        values = np.asarray(values)[order]
+        acc_dtype = np.float64 if values.dtype.kind == 'f' else np.int64
+        result[name] = np.add.reduceat(values, breaks, dtype=acc_dtype) if len(breaks) else np.zeros(0, acc_dtype)
+    for name, values in firsts.items():
+        # Like groupby().first(), skip nulls: take the first non-null row within each group
+        values = np.asarray(values, dtype=np.float64)[order]
+        present = np.flatnonzero(~np.isnan(values))
+        group_ids = np.searchsorted(breaks, present, side='right') - 1
+        is_first = np.r_[True, group_ids[1:] != group_ids[:-1]] if len(present) else np.zeros(0, bool)
+        result[name] = np.full(len(breaks), np.nan)
+        result[name][group_ids[is_first]] = values[present[is_first]]
+    
+    return result
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def query_station_stats(_df, data_key, station_col, lat_col, lng_col):
+    """Queries per-station ride count and avg duration for mapping/tables (cached on data_key); callers pick their own top N"""
+    # Groups come out in station-name order, so nlargest ties resolve as they did after groupby
+    codes, stations = sorted_factorize(_df[station_col])
+    groups = group_reduce(
+        codes,
+        sums={'duration': _df['ride_time_min'], 'member': _df['is_member'], 'casual': _df['is_casual']},
+        firsts={'lat': _df[lat_col], 'lng': _df[lng_col]}
+    )
     
-    # Final formatting
-    routes['Trips'] = routes['Trips'].round(0).astype(int)
-    routes['Avg Duration'] = routes['Avg Duration'].round(0).astype(int)
-    routes['Member Trips'] = routes['Member Trips'].round(0).astype(int)
-    routes['Casual Trips'] = routes['Casual Trips'].round(0).astype(int)
+    grouped = pd.DataFrame({
+        'Station Name': stations[groups['code']],
+        'Trips': groups['count'],
+        'Avg Duration': (groups['duration'] / groups['count'] + 0.5).astype(np.int16),
+        'Lat': groups['lat'],
+        'Lng': groups['lng'],
+        'Member_Trips': groups['member'],
+        'Casual_Trips': groups['casual']
+    })
+    
+    return grouped
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def query_top_routes(_df, data_key, n=20):
+    """Queries top N routes with ride count and member/casual breakdown (cached on data_key)"""
+    # Combine start/end station codes into one integer key per route; codes follow (start, end)
+    # name order, as the groupby rows did, so ties at the cutoff resolve the same way
+    start_codes, starts = sorted_factorize(_df['start_station_name'])
+    end_codes, ends = sorted_factorize(_df['end_station_name'])
+    codes = start_codes.astype(np.int64) * len(ends) + end_codes
+    valid = (start_codes >= 0) & (end_codes >= 0)
+    codes = codes[valid]
+    
+    # Route counts by direct indexing into the dense start x end code space (one O(N) pass, no sort)
+    counts = np.bincount(codes)
+    n = min(n, np.count_nonzero(counts))
+    # Keep every route tied with the n-th count, then order by count desc and route code so
+    # the selection is deterministic (argpartition alone picks among ties arbitrarily)
+    cutoff = -np.partition(-counts, n - 1)[n - 1] if n > 0 else np.inf
+    candidates = np.flatnonzero(counts >= cutoff)
+    top_codes = candidates[np.lexsort((candidates, -counts[candidates]))][:n]
+    
+    # Sums are only needed for the selected routes: map each ride to its route's slot (or -1)
+    slot = np.full(len(counts), -1, dtype=np.int64)
+    slot[top_codes] = np.arange(n)
+    ride_slots = slot[codes]
+    in_top = ride_slots >= 0
+    duration = np.bincount(ride_slots[in_top], weights=_df['ride_time_min'].to_numpy()[valid][in_top], minlength=n)
+    member = np.bincount(ride_slots[in_top], weights=_df['is_member'].to_numpy()[valid][in_top], minlength=n)
+    
+    routes = pd.DataFrame({
+        'Start Station': starts[top_codes // len(ends)],
+        'End Station': ends[top_codes % len(ends)],
+        'Trips': counts[top_codes],
+        'Avg Duration': (duration / counts[top_codes] + 0.5).astype(np.int16),
+        'Member Trips': member.astype(np.int64)
+    })
+    # Counts are already integers; only the mean duration needed rounding above
+    routes['Casual Trips'] = routes['Trips'] - routes['Member Trips']
     
     return routes
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def query_station_markers(_stations, data_key):
+    """Map centre and GeoJSON station markers (radius/colour in the properties) for the stations map (cached on data_key)"""
+    max_rides = _stations['Trips'].max()
+    trips = _stations['Trips'].to_numpy()
+    radii = 5 + (trips / max_rides * 15) if max_rides > 0 else np.full(len(trips), 5.0)
+    colors = np.where(_stations['Dominant Rider'].to_numpy() == 'Member', '#1a4d7d', '#f4a460')
+    
+    # One FeatureCollection for all stations instead of a marker object per row
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [float(lng), float(lat)]},
+            'properties': {
+                'name': name, 'rides': f"{n_trips:,.0f}", 'dominant': dominant,
+                'member': f"{n_member:,.0f}", 'casual': f"{n_casual:,.0f}",
+                'radius': float(radius), 'color': color,
+            },
+        }
+        for name, lat, lng, n_trips, dominant, n_member, n_casual, radius, color in zip(
+            _stations['Station Name'], _stations['Lat'], _stations['Lng'], trips, _stations['Dominant Rider'],
+            _stations['Member_Trips'], _stations['Casual_Trips'], radii, colors
+        )
+    ]
+    
+    center = [float(_stations['Lat'].mean()), float(_stations['Lng'].mean())]
+    return center, {'type': 'FeatureCollection', 'features': features}
+
 # --- Holiday Data (Retained for consistency) ---
 HOLIDAYS_DATA = [
     ('2024-09-02', 'Labor Day'), ('2024-10-14', 'Columbus Day'), 
@@ -181,52 +426,49 @@ HOLIDAYS_DATA = [
     ('2025-07-04', 'Independence Day'), ('2025-09-01', 'Labor Day'),
 ]
 
+# Holiday days as datetime64[D], matched against the 'date' column built in load_data
+HOLIDAY_DAYS = np.array([day for day, _ in HOLIDAYS_DATA], dtype='datetime64[D]')
+
+@st.cache_resource(show_spinner=False)
 def get_holiday_df():
-    """Create holiday dataframe"""
+    """Create holiday dataframe (built once per process and shared; do not modify it)"""
     holiday_df = pd.DataFrame(HOLIDAYS_DATA, columns=['holiday_date', 'holiday_name'])
-    holiday_df['holiday_date'] = pd.to_datetime(holiday_df['holiday_date']).dt.date
+    holiday_df['holiday_date'] = pd.to_datetime(holiday_df['holiday_date'])
     return holiday_df
 
-def query_holiday_stats(df):
-    """Statistical summary by holiday"""
-    holiday_df = get_holiday_df()
-    df['date'] = df['started_at'].dt.date 
-    
-    holiday_rides = df[df['date'].isin(holiday_df['holiday_date'])].copy()
+@st.cache_data(max_entries=32, show_spinner=False)
+def query_holiday_stats(_df, data_key):
+    """Statistical summary by holiday (cached on data_key)"""
+    holiday_mask = np.isin(_df['date'].to_numpy(), HOLIDAY_DAYS)
+    holiday_rides = _df.loc[holiday_mask, ['date', 'ride_time_min', 'is_member', 'is_casual']].copy()
     
     if holiday_rides.empty:
         return pd.DataFrame()
     
-    holiday_rides = holiday_rides.merge(
-        holiday_df, left_on='date', right_on='holiday_date', how='left'
-    )
+    # One grouped pass instead of re-slicing the rides per holiday: masking durations
+    # by rider type lets 'mean' skip the other type's rows (NaN) within each group
+    holiday_rides['member_duration'] = holiday_rides['ride_time_min'].where(holiday_rides['is_member'] == 1)
+    holiday_rides['casual_duration'] = holiday_rides['ride_time_min'].where(holiday_rides['is_casual'] == 1)
     
-    stats_list = []
-    for holiday_date in holiday_rides['holiday_date'].unique():
-        holiday_subset = holiday_rides[holiday_rides['holiday_date'] == holiday_date]
-        if holiday_subset.empty: continue
-            
-        holiday_name = holiday_subset['holiday_name'].iloc[0]
-        total = len(holiday_subset)
-        members = len(holiday_subset[holiday_subset['member_casual'] == 'member'])
-        casual = total - members
-        
-        member_subset = holiday_subset[holiday_subset['member_casual']=='member']
-        casual_subset = holiday_subset[holiday_subset['member_casual']=='casual']
-
-        stats_list.append({
-            'holiday_date': holiday_date,
-            'holiday_name': holiday_name,
-            'total_rides': total,
-            'member_rides': members,
-            'casual_rides': casual,
-            'member_pct': round((members / total * 100) if total > 0 else 0, 1),
-            'casual_pct': round((casual / total * 100) if total > 0 else 0, 1),
-            'avg_member_duration': round(member_subset['ride_time_min'].mean(), 1) if not member_subset.empty else 0,
-            'avg_casual_duration': round(casual_subset['ride_time_min'].mean(), 1) if not casual_subset.empty else 0
-        })
-    
-    return pd.DataFrame(stats_list).sort_values('holiday_date')
+    stats = holiday_rides.groupby('date').agg(
+        total_rides=('is_member', 'size'),
+        member_rides=('is_member', 'sum'),
+        casual_rides=('is_casual', 'sum'),
+        avg_member_duration=('member_duration', 'mean'),
+        avg_casual_duration=('casual_duration', 'mean')
+    ).reset_index().rename(columns={'date': 'holiday_date'})
+    
+    # Names are looked up on the aggregated rows (one per holiday) instead of joined per ride
+    holiday_names = get_holiday_df().set_index('holiday_date')['holiday_name']
+    stats['holiday_name'] = stats['holiday_date'].map(holiday_names)
+    
+    stats['member_pct'] = (stats['member_rides'] / stats['total_rides'] * 100).round(1)
+    stats['casual_pct'] = (stats['casual_rides'] / stats['total_rides'] * 100).round(1)
+    stats['avg_member_duration'] = stats['avg_member_duration'].astype('float64').round(1).fillna(0)
+    stats['avg_casual_duration'] = stats['avg_casual_duration'].astype('float64').round(1).fillna(0)
+    
+    return stats[['holiday_date', 'holiday_name', 'total_rides', 'member_rides', 'casual_rides',
+                  'member_pct', 'casual_pct', 'avg_member_duration', 'avg_casual_duration']]
 
 # --- Plotly Enhancement ---
 def enhance_plotly_figure(fig, show_legend=False, x_anchor='left', y_anchor='top', x_pos=1.05, y_pos=1):
@@ -247,7 +489,7 @@ def enhance_plotly_figure(fig, show_legend=False, x_anchor='left', y_anchor='top
     fig.update_xaxes(showgrid=False, gridcolor='#e5e5e5')
     fig.update_yaxes(showgrid=False, gridcolor='#e5e5e5', tickformat=',.0f')
     
-    if fig.data and fig.data[0].type in ['bar', 'scatter', 'line']:
+    if fig.data and fig.data[0].type in ['bar', 'scatter', 'scattergl', 'line']:
         if fig.data[0].type == 'line':
             fig.update_traces(hovertemplate='Rides: %{y:,.0f}<extra></extra>')
         else:
@@ -270,6 +512,45 @@ CUSTOM_LEGEND_HTML = """
     </div>
 """
 
+# --- Strategic Recommendations: (title, description), built once at import ---
+RECOMMENDATIONS = (
+    (
+        '1. Time-Based Membership Tiers',
+        'Introduce flexible membership tiers: (a) Peak-hour commuter pass for members (lower cost, limited hours), (b) Weekend/Leisure pass for casual riders, priced to capture the value of their long, weekend trips. This aligns pricing with usage behavior.'
+    ),
+    (
+        '2. High-Value Conversion Promotions',
+        'Launch aggressive, limited-time promotions during **peak season (Summer)** and **high-casual holidays** (e.g., Independence Day). Offer a "Summer Pass" that automatically converts to an annual membership discount after 3 months, or a "Holiday Explorer" bundle.'
+    ),
+    (
+        '3. Destination-Based Incentives',
+        'Partner with attractions, restaurants, and entertainment venues near top casual stations and routes. Offer membership sign-up benefits (e.g., free coffee coupon, attraction discount) directly at these high-traffic leisure locations.'
+    ),
+    (
+        '4. Duration-Incentive Program for Conversion',
+        'Target casual riders who take long trips with a message like: "Stop paying high fees for long rides—members ride for one low annual price." Introduce a *reduced rate* for member trips over 30 minutes to solidify loyalty against the higher cost structure for casual riders.'
+    ),
+    (
+        '5. Geographic and Inventory Optimization',
+        'Use geographic and holiday data to pre-position bikes at high-casual-use stations (especially on weekends and holidays) and ensure adequate supply at key commute stations during weekday peak hours. This maximizes utilization and customer satisfaction for both segments.'
+    ),
+)
+# Rendered once: the whole section is a single markdown string
+RECOMMENDATIONS_MD = "\n\n".join(f"**{title}**\n\n{description}\n\n---" for title, description in RECOMMENDATIONS)
+
+# --- Static Page Sections ---
+@st.fragment
+def render_recommendations_and_footer(last_updated):
+    """Renders the strategic recommendations and the page footer; depends on no filter or data"""
+    with st.expander("🎯 Strategic Recommendations", expanded=True):
+        st.markdown(RECOMMENDATIONS_MD)
+    
+    st.divider()
+    
+    # Footer: native captions instead of raw HTML
+    st.caption("Cyclistic Bike-Share Analytics Dashboard | Google Data Analytics Capstone Project", text_alignment='center')
+    st.caption(f"Data powered by Divvy | Last updated: {last_updated}", text_alignment='center')
+
 # ============================================================================
 # MAIN APPLICATION
 # ============================================================================
@@ -280,6 +561,9 @@ CUSTOM_LEGEND_HTML = """
 #     if df is None:
 #         st.stop()
 def main():
+    # Timestamp of this run, taken once and shown in the footer
+    last_updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
     # Debug info
     st.write("Current working directory:", os.getcwd())
     st.write("Contents of Data/12_Months_data (if it exists):")
@@ -305,23 +589,56 @@ def main():
         help="Filter by membership status"
     )
     
-    st.sidebar.markdown("**🌤️ Seasons**")
-    seasons_options = ["Winter", "Spring", "Summer", "Fall"]
-    seasons = [season for season in seasons_options if st.sidebar.checkbox(season, value=True, key=f"season_{season}")]
-    if not seasons: seasons = seasons_options
+    # One widget per filter: any number of changes costs a single rerun (empty selection means all)
+    seasons_options = SEASON_ORDER
+    seasons = st.sidebar.multiselect("🌤️ Seasons", seasons_options, default=seasons_options) or seasons_options
     
-    st.sidebar.markdown("**🚲 Bike Type**")
-    bike_options = df['rideable_type'].unique().tolist()
-    bike_types = [bike for bike in bike_options if st.sidebar.checkbox(bike, value=True, key=f"bike_{bike}")]
-    if not bike_types: bike_types = bike_options
+    # Categories of the categorical column: no scan of the ride rows
+    bike_options = df['rideable_type'].cat.categories.tolist()
+    bike_types = st.sidebar.multiselect("🚲 Bike Type", bike_options, default=bike_options) or bike_options
     
-    # Apply filters
-    filtered_df = filter_data(df, rider_type, seasons, bike_types)
+    # Apply filters (cached per selection on the full frame's fingerprint)
+    data_key = data_fingerprint(df)
+    season_key, bike_key = tuple(sorted(seasons)), tuple(sorted(bike_types))
+    filtered_df = filter_data(df, data_key, rider_type, season_key, bike_key)
     
     if filtered_df.empty:
         st.warning("⚠️ No data matches your filter criteria. Please adjust your selections.")
         return
     
+    # Cache keys for the query_* functions (the frames themselves are not hashed)
+    filter_key = data_fingerprint(filtered_df, rider_type, season_key, bike_key)
+    
+    # Rider and weekend masks feeding the shared metrics below
+    is_member = filtered_df['is_member'].to_numpy(dtype=bool)
+    is_casual = filtered_df['is_casual'].to_numpy(dtype=bool)
+    is_weekend = isin_categorical(filtered_df['weekday'], ('Sat', 'Sun'))
+    ride_time = filtered_df['ride_time_min'].to_numpy()
+    
+    # Headline metrics computed once; read by the key metrics, the donuts and the insights section
+    total_rides = len(filtered_df)
+    member_rides = int(is_member.sum())
+    casual_rides = int(is_casual.sum())
+    member_minutes = ride_time[is_member].sum(dtype=np.float64)
+    casual_minutes = ride_time[is_casual].sum(dtype=np.float64)
+    metrics = {
+        'total_rides': total_rides,
+        'member_rides': member_rides,
+        'casual_rides': casual_rides,
+        'member_pct': (member_rides / total_rides) * 100 if total_rides > 0 else 0,
+        'casual_pct': (casual_rides / total_rides) * 100 if total_rides > 0 else 0,
+        'avg_duration': ride_time.mean(dtype=np.float64),
+        'member_avg_duration': member_minutes / member_rides if member_rides > 0 else 0,
+        'casual_avg_duration': casual_minutes / casual_rides if casual_rides > 0 else 0,
+        'member_hours': member_minutes / 60,
+        'casual_hours': casual_minutes / 60,
+        'member_weekend_pct': ((is_member & is_weekend).sum() / member_rides) * 100 if member_rides > 0 else 0,
+        'casual_weekend_pct': ((is_casual & is_weekend).sum() / casual_rides) * 100 if casual_rides > 0 else 0,
+    }
+    
+    # Holiday stats cover the full dataset; shared by the holiday analysis and the insights section
+    holiday_stats = query_holiday_stats(df, data_key)
+    
     # ========================================================================
     # 1. HEADER & KEY METRICS
     # ========================================================================
@@ -331,19 +648,12 @@ def main():
         st.markdown("*Insights on how **annual members** and **casual riders** use Cyclistic differently*")
     st.divider()
     
-    member_data = filtered_df[filtered_df['member_casual'] == 'member']
-    casual_data = filtered_df[filtered_df['member_casual'] == 'casual']
-    
-    total_rides = len(filtered_df)
-    member_rides = len(member_data)
-    casual_rides = len(casual_data)
-    
-    member_pct = round((member_rides / total_rides) * 100) if total_rides > 0 else 0
-    casual_pct = round((casual_rides / total_rides) * 100) if total_rides > 0 else 0
-    member_millions = member_rides / 1_000_000
-    casual_millions = casual_rides / 1_000_000
-    total_millions = total_rides / 1_000_000
-    avg_duration = round(filtered_df['ride_time_min'].mean())
+    member_pct = round(metrics['member_pct'])
+    casual_pct = round(metrics['casual_pct'])
+    member_millions = metrics['member_rides'] / 1_000_000
+    casual_millions = metrics['casual_rides'] / 1_000_000
+    total_millions = metrics['total_rides'] / 1_000_000
+    avg_duration = round(metrics['avg_duration'])
     
     col1, col2, col3, col4 = st.columns([1.5, 1.5, 1.5, 1.5])
     
@@ -391,48 +701,46 @@ def main():
     st.markdown(CUSTOM_LEGEND_HTML, unsafe_allow_html=True)
     
     try:
-        filtered_df['hours_travelled'] = filtered_df['ride_time_min'] / 60
         col1, col2, col3 = st.columns(3)
         
+        # Donut values come straight from the shared metrics (rider types with no rides are left out)
+        donut_labels, donut_colors, donut_rides, donut_durations, donut_hours = [], [], [], [], []
+        for label, color, key in (('Member', '#1a4d7d', 'member'), ('Casual', '#f4a460', 'casual')):
+            if metrics[f'{key}_rides'] > 0:
+                donut_labels.append(label)
+                donut_colors.append(color)
+                donut_rides.append(metrics[f'{key}_rides'])
+                donut_durations.append(round(metrics[f'{key}_avg_duration']))
+                donut_hours.append(metrics[f'{key}_hours'])
+        
         # 1. Number of Rides Donut
         with col1:
-            rides_by_type = filtered_df.groupby('member_casual').size().reset_index(name='rides')
-            rides_by_type['label'] = rides_by_type['member_casual'].map({'member': 'Member', 'casual': 'Casual'})
-            total_rides_count = rides_by_type['rides'].sum()
-            
-            fig_rides = px.pie(rides_by_type, values='rides', names='label', title='Total Rides Distribution', 
-                               color='label', color_discrete_map={'Member': '#1a4d7d', 'Casual': '#f4a460'}, hole=0.5)
-            fig_rides.update_traces(textposition='inside', textinfo='percent', hovertemplate='%{label}: %{value:,.0f} rides<br>(%{percent})<extra></extra>')
+            fig_rides = go.Figure(go.Pie(labels=donut_labels, values=donut_rides, hole=0.5, marker_colors=donut_colors,
+                                         textposition='inside', textinfo='percent',
+                                         hovertemplate='%{label}: %{value:,.0f} rides<br>(%{percent})<extra></extra>'))
+            fig_rides.update_layout(title_text='Total Rides Distribution')
             fig_rides = enhance_plotly_figure(fig_rides) 
-            fig_rides.add_annotation(text=f"{total_rides_count:,.0f}", x=0.5, y=0.5, font_size=24, showarrow=False, font_color="#333", font_weight='bold')
+            fig_rides.add_annotation(text=f"{metrics['total_rides']:,.0f}", x=0.5, y=0.5, font_size=24, showarrow=False, font_color="#333", font_weight='bold')
             st.plotly_chart(fig_rides, use_container_width=True)
         
         # 2. Avg Trip Duration Donut
         with col2:
-            duration_by_type = filtered_df.groupby('member_casual')['ride_time_min'].mean().round(0).reset_index()
-            duration_by_type['label'] = duration_by_type['member_casual'].map({'member': 'Member', 'casual': 'Casual'})
-            duration_by_type.columns = ['member_casual', 'avg_duration', 'label']
-            total_avg_duration = round(filtered_df['ride_time_min'].mean())
-            
-            fig_duration = px.pie(duration_by_type, values='avg_duration', names='label', title='Average Trip Duration (min)', 
-                                color='label', color_discrete_map={'Member': '#1a4d7d', 'Casual': '#f4a460'}, hole=0.5)
-            fig_duration.update_traces(textposition='inside', textinfo='percent', hovertemplate='%{label}: %{value:,.0f} min<br>(%{percent})<extra></extra>')
+            fig_duration = go.Figure(go.Pie(labels=donut_labels, values=donut_durations, hole=0.5, marker_colors=donut_colors,
+                                            textposition='inside', textinfo='percent',
+                                            hovertemplate='%{label}: %{value:,.0f} min<br>(%{percent})<extra></extra>'))
+            fig_duration.update_layout(title_text='Average Trip Duration (min)')
             fig_duration = enhance_plotly_figure(fig_duration)
-            fig_duration.add_annotation(text=f"{total_avg_duration:,.0f}m", x=0.5, y=0.5, font_size=24, showarrow=False, font_color="#333", font_weight='bold')
+            fig_duration.add_annotation(text=f"{avg_duration:,.0f}m", x=0.5, y=0.5, font_size=24, showarrow=False, font_color="#333", font_weight='bold')
             st.plotly_chart(fig_duration, use_container_width=True)
         
         # 3. Total Hours Travelled Donut
         with col3:
-            hours_by_type = filtered_df.groupby('member_casual')['hours_travelled'].sum().reset_index()
-            hours_by_type['label'] = hours_by_type['member_casual'].map({'member': 'Member', 'casual': 'Casual'})
-            hours_by_type.columns = ['member_casual', 'total_hours', 'label']
-            total_hours_count = hours_by_type['total_hours'].sum()
-            
-            fig_hours = px.pie(hours_by_type, values='total_hours', names='label', title='Total Hours Travelled', 
-                            color='label', color_discrete_map={'Member': '#1a4d7d', 'Casual': '#f4a460'}, hole=0.5)
-            fig_hours.update_traces(textposition='inside', textinfo='percent', hovertemplate='%{label}: %{value:,.0f} hours<br>(%{percent})<extra></extra>')
+            fig_hours = go.Figure(go.Pie(labels=donut_labels, values=donut_hours, hole=0.5, marker_colors=donut_colors,
+                                         textposition='inside', textinfo='percent',
+                                         hovertemplate='%{label}: %{value:,.0f} hours<br>(%{percent})<extra></extra>'))
+            fig_hours.update_layout(title_text='Total Hours Travelled')
             fig_hours = enhance_plotly_figure(fig_hours)
-            fig_hours.add_annotation(text=f"{total_hours_count:,.0f}", x=0.5, y=0.5, font_size=24, showarrow=False, font_color="#333", font_weight='bold')
+            fig_hours.add_annotation(text=f"{sum(donut_hours):,.0f}", x=0.5, y=0.5, font_size=24, showarrow=False, font_color="#333", font_weight='bold')
             st.plotly_chart(fig_hours, use_container_width=True)
         
     except Exception as e:
@@ -449,49 +757,28 @@ def main():
     try:
         col1, col2 = st.columns(2)
         color_map = {'member': '#1a4d7d', 'casual': '#f4a460'}
-        is_all_riders = rider_type == "All Riders"
-        current_color = color_map[rider_type.lower()] if not is_all_riders else None
         
         # Monthly trends
         with col1:
-            monthly_data = filtered_df.groupby(['month_year', 'member_casual']).size().reset_index(name='rides')
-            monthly_data['sort_key'] = pd.to_datetime(monthly_data['month_year'], format='%Y-%m')
-            monthly_data = monthly_data.sort_values('sort_key').drop('sort_key', axis=1)
-            
-            if not is_all_riders:
-                monthly_data = monthly_data[monthly_data['member_casual'] == rider_type.lower()]
-            
-            fig_monthly = px.line(monthly_data, x='month_year', y='rides', 
-                                color='member_casual' if is_all_riders else None,
-                                title='Monthly Ride Trends', labels={'rides': 'Number of Rides', 'month_year': 'Month'},
-                                markers=True, 
-                                color_discrete_map=color_map if is_all_riders else None)
+            # Rows follow the ordered month_year categorical, i.e. chronological
+            monthly_data = query_ride_counts(filtered_df, filter_key, 'month_year')
             
-            if not is_all_riders and fig_monthly.data:
-                fig_monthly.data[0].marker.color = current_color
-                fig_monthly.data[0].line.color = current_color
+            fig_monthly = px.line(monthly_data, x=monthly_data.index, y=list(monthly_data.columns),
+                                title='Monthly Ride Trends', labels={'value': 'Number of Rides', 'month_year': 'Month'},
+                                markers=True, render_mode='webgl', color_discrete_map=color_map)
 
             fig_monthly = enhance_plotly_figure(fig_monthly, show_legend=False)
             st.plotly_chart(fig_monthly, use_container_width=True)
         
         # Hourly distribution
         with col2:
-            hourly_data = filtered_df.groupby(['hour', 'member_casual']).size().reset_index(name='rides')
-            hourly_data = hourly_data.sort_values('hour')
-            hourly_data['time_label'] = hourly_data['hour'].apply(lambda x: f"{x % 12 or 12}:00 {'AM' if x < 12 else 'PM'}")
-            
-            if not is_all_riders:
-                hourly_data = hourly_data[hourly_data['member_casual'] == rider_type.lower()]
+            hourly_data = query_hourly_counts(filtered_df, filter_key)
+            hourly_data.index = pd.Index(HOUR_LABELS[hourly_data.index.to_numpy()], name='time_label')
 
-            fig_hourly = px.bar(hourly_data, x='time_label', y='rides', 
-                                color='member_casual' if is_all_riders else None, 
-                                barmode='group' if is_all_riders else 'relative',
+            fig_hourly = px.bar(hourly_data, x=hourly_data.index, y=list(hourly_data.columns), barmode='group',
                                 title='Hourly Ride Distribution (Commute vs. Leisure Peaks)', 
-                                labels={'rides': 'Number of Rides', 'time_label': 'Time of Day'},
-                                color_discrete_map=color_map if is_all_riders else None)
-            
-            if not is_all_riders:
-                fig_hourly.update_traces(marker_color=current_color)
+                                labels={'value': 'Number of Rides', 'time_label': 'Time of Day'},
+                                color_discrete_map=color_map)
             
             fig_hourly = enhance_plotly_figure(fig_hourly)
             fig_hourly.update_traces(hovertemplate='Time: %{x}<br>Rides: %{y:,.0f}<extra></extra>')
@@ -515,24 +802,13 @@ def main():
         
         # Weekday analysis
         with col1:
-            weekday_order = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-            weekday_data = filtered_df.groupby(['weekday', 'member_casual']).size().reset_index(name='rides')
-            
-            if not is_all_riders:
-                weekday_data = weekday_data[weekday_data['member_casual'] == rider_type.lower()]
+            weekday_data = query_ride_counts(filtered_df, filter_key, 'weekday')
+            weekday_data = weekday_data.loc[[day for day in WEEKDAY_ORDER if day in weekday_data.index]]
             
-            weekday_data['weekday'] = pd.Categorical(weekday_data['weekday'], categories=weekday_order, ordered=True)
-            weekday_data = weekday_data.sort_values('weekday')
-            
-            fig_weekday = px.bar(weekday_data, x='weekday', y='rides', 
-                                color='member_casual' if is_all_riders else None, 
-                                barmode='group' if is_all_riders else 'relative',
+            fig_weekday = px.bar(weekday_data, x=weekday_data.index, y=list(weekday_data.columns), barmode='group',
                                 title='Rides by Weekday', 
-                                labels={'rides': 'Number of Rides', 'weekday': 'Day of Week'},
-                                color_discrete_map=color_map if is_all_riders else None)
-            
-            if not is_all_riders:
-                fig_weekday.update_traces(marker_color=current_color)
+                                labels={'value': 'Number of Rides', 'weekday': 'Day of Week'},
+                                color_discrete_map=color_map)
             
             fig_weekday = enhance_plotly_figure(fig_weekday)
             fig_weekday.update_traces(hovertemplate='Day: %{x}<br>Rides: %{y:,.0f}<extra></extra>')
@@ -541,24 +817,13 @@ def main():
         
         # Seasonal analysis
         with col2:
-            season_order = ['Winter', 'Spring', 'Summer', 'Fall']
-            season_data = filtered_df.groupby(['season', 'member_casual']).size().reset_index(name='rides')
-            
-            if not is_all_riders:
-                season_data = season_data[season_data['member_casual'] == rider_type.lower()]
+            season_data = query_ride_counts(filtered_df, filter_key, 'season')
+            season_data = season_data.loc[[season for season in SEASON_ORDER if season in season_data.index]]
             
-            season_data['season'] = pd.Categorical(season_data['season'], categories=season_order, ordered=True)
-            season_data = season_data.sort_values('season')
-            
-            fig_season = px.bar(season_data, x='season', y='rides', 
-                                color='member_casual' if is_all_riders else None, 
-                                barmode='group' if is_all_riders else 'relative',
+            fig_season = px.bar(season_data, x=season_data.index, y=list(season_data.columns), barmode='group',
                                 title='Rides by Season', 
-                                labels={'rides': 'Number of Rides', 'season': 'Season'},
-                                color_discrete_map=color_map if is_all_riders else None)
-            
-            if not is_all_riders:
-                fig_season.update_traces(marker_color=current_color)
+                                labels={'value': 'Number of Rides', 'season': 'Season'},
+                                color_discrete_map=color_map)
             
             fig_season = enhance_plotly_figure(fig_season)
             fig_season.update_traces(hovertemplate='Season: %{x}<br>Rides: %{y:,.0f}<extra></extra>')
@@ -577,21 +842,12 @@ def main():
     st.markdown(CUSTOM_LEGEND_HTML, unsafe_allow_html=True)
     
     try:
-        bike_data = filtered_df.groupby(['rideable_type', 'member_casual']).size().reset_index(name='rides')
-        
-        if not is_all_riders:
-            bike_data = bike_data[bike_data['member_casual'] == rider_type.lower()]
-            color_param, barmode_param, color_map_param = None, 'relative', None
-        else:
-            color_param, barmode_param, color_map_param = 'member_casual', 'group', color_map
+        bike_data = query_ride_counts(filtered_df, filter_key, 'rideable_type')
 
-        fig_bike = px.bar(bike_data, x='rideable_type', y='rides', color=color_param, barmode=barmode_param,
+        fig_bike = px.bar(bike_data, x=bike_data.index, y=list(bike_data.columns), barmode='group',
                           title='Bike Type Usage by Rider Type', 
-                          labels={'rides': 'Number of Rides', 'rideable_type': 'Bike Type'},
-                          color_discrete_map=color_map_param)
-        
-        if not is_all_riders:
-            fig_bike.update_traces(marker_color=current_color)
+                          labels={'value': 'Number of Rides', 'rideable_type': 'Bike Type'},
+                          color_discrete_map=color_map)
             
         fig_bike = enhance_plotly_figure(fig_bike)
         fig_bike.update_traces(hovertemplate='Type: %{x}<br>Rides: %{y:,.0f}<extra></extra>')
@@ -610,53 +866,37 @@ def main():
     try:
         col1, col2 = st.columns([1, 2])
         
-        # Get all start station data based on current filters
-        all_start_stats = filtered_df.groupby(['start_station_name']).agg(
-            Trips=('ride_id', 'count'),
-            Lat=('start_lat', 'first'),
-            Lng=('start_lng', 'first'),
-            Member_Trips=('member_casual', lambda x: (x.astype(str).str.strip().str.lower() == 'member').sum()),
-            Casual_Trips=('member_casual', lambda x: (x.astype(str).str.strip().str.lower() == 'casual').sum())
-        ).reset_index().rename(columns={'start_station_name': 'Station Name'})
-        
-        all_start_stats['Dominant Rider'] = np.where(all_start_stats['Member_Trips'] > all_start_stats['Casual_Trips'], 'Member', 'Casual')
+        # Get all start station data based on current filters (shared with section 7 via the query cache)
+        all_start_stats = query_station_stats(filtered_df, filter_key, 'start_station_name', 'start_lat', 'start_lng')
         
         # Filter for top 50 unique stations by total trips for manageable display
         top_stations_for_map = all_start_stats.nlargest(50, 'Trips')
+        top_stations_for_map['Dominant Rider'] = np.where(top_stations_for_map['Member_Trips'] > top_stations_for_map['Casual_Trips'], 'Member', 'Casual')
         
         if top_stations_for_map.empty:
             st.info("No starting station data available for mapping under current filters.")
         else:
-            # Map generation
-            avg_lat = top_stations_for_map['Lat'].mean()
-            avg_lng = top_stations_for_map['Lng'].mean()
-            max_rides = top_stations_for_map['Trips'].max()
-            
-            map_start = folium.Map(location=[avg_lat, avg_lng], zoom_start=12, tiles='OpenStreetMap')
+            # Marker data is cached per filter selection; only the lightweight Map shell is rebuilt
+            center, stations_geojson = query_station_markers(top_stations_for_map, filter_key)
+            map_start = folium.Map(location=center, zoom_start=12, tiles='OpenStreetMap')
             
-            for idx, row in top_stations_for_map.iterrows():
-                rider_type = row['Dominant Rider']
-                color = '#1a4d7d' if rider_type == 'Member' else '#f4a460'
-                
-                # Scale marker radius by trip volume
-                radius = 5 + (row['Trips'] / max_rides * 15) if max_rides > 0 else 5
-                
-                popup_html = f"""
-                <b>{row['Station Name']}</b><br>
-                Total Rides: {row['Trips']:,.0f}<br>
-                Dominant: {rider_type}<br>
-                Member: {row['Member_Trips']:,.0f}<br>
-                Casual: {row['Casual_Trips']:,.0f}
-                """
-                
-                folium.CircleMarker(
-                    location=[row['Lat'], row['Lng']], 
-                    radius=radius,
-                    popup=folium.Popup(popup_html, max_width=300),
-                    color=color, fill=True, fillColor=color, fillOpacity=0.7
-                ).add_to(map_start)
+            folium.GeoJson(
+                stations_geojson,
+                marker=folium.CircleMarker(fill=True, fill_opacity=0.7),
+                style_function=lambda feature: {
+                    'radius': feature['properties']['radius'],
+                    'color': feature['properties']['color'],
+                    'fillColor': feature['properties']['color'],
+                },
+                popup=folium.GeoJsonPopup(
+                    fields=['name', 'rides', 'dominant', 'member', 'casual'],
+                    aliases=['Station', 'Total Rides', 'Dominant', 'Member', 'Casual'],
+                    max_width=300,
+                ),
+            ).add_to(map_start)
             
-            st_folium(map_start, width=900, height=500)
+            # No returned objects: panning/zooming the map does not rerun the whole app
+            st_folium(map_start, width=900, height=500, returned_objects=[])
 
     except Exception as e:
         st.error(f"❌ Error creating map: {str(e)}")
@@ -669,37 +909,30 @@ def main():
     st.markdown('<div class="subheader">⭐ Top 20 Stations: Commute vs. Leisure Focus</div>', unsafe_allow_html=True)
     
     try:
-        # Get overall start station stats
-        all_start_stats_full = filtered_df.groupby(['start_station_name']).agg(
-            Trips=('ride_id', 'count'),
-            Avg_Duration=('ride_time_min', 'mean'),
-            Member_Trips=('member_casual', lambda x: (x.astype(str).str.strip().str.lower() == 'member').sum()),
-            Casual_Trips=('member_casual', lambda x: (x.astype(str).str.strip().str.lower() == 'casual').sum())
-        ).reset_index().rename(columns={'start_station_name': 'Station Name', 'Avg_Duration': 'Avg Duration'})
+        # Get overall start station stats (same cached aggregation as the map in section 6)
+        all_start_stats_full = query_station_stats(filtered_df, filter_key, 'start_station_name', 'start_lat', 'start_lng')
         
-        all_start_stats_full['Avg Duration'] = all_start_stats_full['Avg Duration'].round(0).astype(int)
+        # Display columns, selected and renamed in one step (no intermediate copy)
+        table_columns = {
+            'Station Name': 'Station Name', 'Trips': 'Total Trips', 'Member_Trips': 'Member Trips',
+            'Casual_Trips': 'Casual Trips', 'Avg Duration': 'Avg Duration (min)'
+        }
         
         # 1. Member-Dominant Stations
-        member_dominant = all_start_stats_full.sort_values('Member_Trips', ascending=False).head(20)
-        member_dominant['Dominance'] = 'Member'
+        member_dominant = all_start_stats_full.nlargest(20, 'Member_Trips')
         
         # 2. Casual-Dominant Stations
-        casual_dominant = all_start_stats_full.sort_values('Casual_Trips', ascending=False).head(20)
-        casual_dominant['Dominance'] = 'Casual'
+        casual_dominant = all_start_stats_full.nlargest(20, 'Casual_Trips')
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("**Top 20 Member-Focused Starting Stations**")
-            member_table = member_dominant[['Station Name', 'Trips', 'Member_Trips', 'Casual_Trips', 'Avg Duration']].copy()
-            member_table.columns = ['Station Name', 'Total Trips', 'Member Trips', 'Casual Trips', 'Avg Duration (min)']
-            st.dataframe(member_table, use_container_width=True, hide_index=True)
+            st.dataframe(member_dominant[list(table_columns)].rename(columns=table_columns), use_container_width=True, hide_index=True)
         
         with col2:
             st.markdown("**Top 20 Casual-Focused Starting Stations**")
-            casual_table = casual_dominant[['Station Name', 'Trips', 'Member_Trips', 'Casual_Trips', 'Avg Duration']].copy()
-            casual_table.columns = ['Station Name', 'Total Trips', 'Member Trips', 'Casual Trips', 'Avg Duration (min)']
-            st.dataframe(casual_table, use_container_width=True, hide_index=True)
+            st.dataframe(casual_dominant[list(table_columns)].rename(columns=table_columns), use_container_width=True, hide_index=True)
         
     except Exception as e:
         st.error(f"❌ Error creating station analysis tables: {str(e)}")
@@ -711,7 +944,7 @@ def main():
     
     try:
         st.markdown("**Top 20 Popular Routes (Start → End) based on current filters**")
-        routes = query_top_routes(filtered_df, n=20)
+        routes = query_top_routes(filtered_df, filter_key, n=20)
         
         st.dataframe(
             routes[['Start Station', 'End Station', 'Trips', 'Member Trips', 'Casual Trips', 'Avg Duration']], 
@@ -729,8 +962,6 @@ def main():
     st.markdown('<div class="subheader">🎄 Holiday Ride Patterns Analysis</div>', unsafe_allow_html=True)
     
     try:
-        holiday_stats = query_holiday_stats(df)
-        
         if not holiday_stats.empty:
             st.markdown("**Holiday vs Regular Day Comparison**")
             
@@ -739,13 +970,13 @@ def main():
             st.dataframe(holiday_display, use_container_width=True, hide_index=True)
             
             if len(holiday_stats) > 0:
-                fig_holiday = px.bar(holiday_stats, x='holiday_name', y=['member_rides', 'casual_rides'],
+                # Name the wide-form columns as the legend should show them, so no trace rewriting is needed
+                holiday_rides = holiday_stats[['holiday_name', 'member_rides', 'casual_rides']].rename(
+                    columns={'member_rides': 'Member', 'casual_rides': 'Casual'})
+                fig_holiday = px.bar(holiday_rides, x='holiday_name', y=['Member', 'Casual'],
                                      barmode='group', title='Member vs Casual Rides by Holiday',
                                      labels={'value': 'Rides', 'holiday_name': 'Holiday', 'variable': 'Rider Type'},
-                                     color_discrete_map={'member_rides': '#1a4d7d', 'casual_rides': '#f4a460'})
-                
-                new_names = {'member_rides': 'Member', 'casual_rides': 'Casual'}
-                fig_holiday.for_each_trace(lambda t: t.update(name = new_names[t.name], legendgroup = new_names[t.name], hovertemplate = t.hovertemplate.replace(t.name, new_names[t.name])))
+                                     color_discrete_map={'Member': '#1a4d7d', 'Casual': '#f4a460'})
 
                 fig_holiday = enhance_plotly_figure(fig_holiday, show_legend=True, x_anchor='right', y_anchor='top', x_pos=1, y_pos=1)
                 fig_holiday.update_xaxes(tickangle=-45)
@@ -764,22 +995,14 @@ def main():
     st.markdown('<div class="subheader">💡 Key Insights & Strategic Recommendations</div>', unsafe_allow_html=True)
     
     try:
-        member_data = filtered_df[filtered_df['member_casual'] == 'member']
-        casual_data = filtered_df[filtered_df['member_casual'] == 'casual']
-        
-        member_pct = (len(member_data) / len(filtered_df)) * 100 if len(filtered_df) > 0 else 0
-        casual_pct = (len(casual_data) / len(filtered_df)) * 100 if len(filtered_df) > 0 else 0
-        member_avg_duration = member_data['ride_time_min'].mean() if not member_data.empty else 0
-        casual_avg_duration = casual_data['ride_time_min'].mean() if not casual_data.empty else 0
+        member_pct = metrics['member_pct']
+        casual_pct = metrics['casual_pct']
+        member_avg_duration = metrics['member_avg_duration']
+        casual_avg_duration = metrics['casual_avg_duration']
         duration_diff = ((casual_avg_duration - member_avg_duration) / member_avg_duration) * 100 if member_avg_duration > 0 else 0
+        member_weekend_pct = metrics['member_weekend_pct']
+        casual_weekend_pct = metrics['casual_weekend_pct']
         
-        member_weekend = filtered_df[(filtered_df['member_casual'] == 'member') & (filtered_df['weekday'].isin(['Sat', 'Sun']))].shape[0]
-        casual_weekend = filtered_df[(filtered_df['member_casual'] == 'casual') & (filtered_df['weekday'].isin(['Sat', 'Sun']))].shape[0]
-        
-        member_weekend_pct = (member_weekend / len(member_data)) * 100 if len(member_data) > 0 else 0
-        casual_weekend_pct = (casual_weekend / len(casual_data)) * 100 if len(casual_data) > 0 else 0
-        
-        holiday_stats = query_holiday_stats(df)
         holiday_insights = ""
         if not holiday_stats.empty:
             avg_holiday_member_pct = holiday_stats['member_pct'].mean()
@@ -798,60 +1021,17 @@ def main():
             
             for finding in findings:
                 st.markdown(f"• {finding}")
-        
-        with st.expander("🎯 Strategic Recommendations", expanded=True):
-            recommendations = [
-                {
-                    'title': '1. Time-Based Membership Tiers',
-                    'description': 'Introduce flexible membership tiers: (a) Peak-hour commuter pass for members (lower cost, limited hours), (b) Weekend/Leisure pass for casual riders, priced to capture the value of their long, weekend trips. This aligns pricing with usage behavior.'
-                },
-                {
-                    'title': '2. High-Value Conversion Promotions',
-                    'description': 'Launch aggressive, limited-time promotions during **peak season (Summer)** and **high-casual holidays** (e.g., Independence Day). Offer a "Summer Pass" that automatically converts to an annual membership discount after 3 months, or a "Holiday Explorer" bundle.'
-                },
-                {
-                    'title': '3. Destination-Based Incentives',
-                    'description': 'Partner with attractions, restaurants, and entertainment venues near top casual stations and routes. Offer membership sign-up benefits (e.g., free coffee coupon, attraction discount) directly at these high-traffic leisure locations.'
-                },
-                {
-                    'title': '4. Duration-Incentive Program for Conversion',
-                    'description': 'Target casual riders who take long trips with a message like: "Stop paying high fees for long rides—members ride for one low annual price." Introduce a *reduced rate* for member trips over 30 minutes to solidify loyalty against the higher cost structure for casual riders.'
-                },
-                {
-                    'title': '5. Geographic and Inventory Optimization',
-                    'description': 'Use geographic and holiday data to pre-position bikes at high-casual-use stations (especially on weekends and holidays) and ensure adequate supply at key commute stations during weekday peak hours. This maximizes utilization and customer satisfaction for both segments.'
-                }
-            ]
-            
-            for rec in recommendations:
-                st.markdown(f"**{rec['title']}**")
-                st.markdown(f"{rec['description']}")
-                st.markdown("---")
     
     except Exception as e:
         st.error(f"❌ Error generating insights: {str(e)}")
     
-    st.divider()
-    
-    # ============================================================================
-    # 10. FOOTER
-    # ============================================================================
-    st.divider()
-    st.markdown("""
-        <div style="text-align: center; color: #999; font-size: 0.9em; margin-top: 2rem;">
-            <p>Cyclistic Bike-Share Analytics Dashboard | Google Data Analytics Capstone Project</p>
-            <p>Data powered by Divvy | Last updated: {}</p>
-        </div>
-    """.format(datetime.now().strftime('%Y-%m-%d %H:%M:%S')), unsafe_allow_html=True)
+    # Static recommendations and footer (section 10) render in their own fragment
+    render_recommendations_and_footer(last_updated)
 
 
 # ============================================================================
 # RUN APPLICATION
 # ============================================================================
 if __name__ == "__main__":
-    try:
-        main()
-    except Exception as e:
-        # This ensures the app doesn't hard-crash on startup
-        st.error(f"🚨 Unhandled error in app: {e}")
-        st.exception(e)
+    # Streamlit's script runner already catches and displays uncaught exceptions
+    main()